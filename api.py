@@ -2,15 +2,28 @@
 import asyncio
 import logging
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Annotated, Optional
 
-from fastapi import FastAPI, HTTPException
+import ijson
+import msgspec
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-
-from config import LOCAL_DB
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel
+
+from config import (
+    API_THREADPOOL_WORKERS,
+    EMBED_DIM,
+    LOCAL_DB,
+    QUERY_CONCURRENCY,
+    SEMANTIC_CACHE_MAX_ELEMENTS,
+    SEMANTIC_CACHE_THRESHOLD,
+)
 from core.rag_builder import build_rag_instance
+from core.semantic_cache import SemanticCache
 
 # 配置日志
 logging.basicConfig(
@@ -22,27 +35,42 @@ logger = logging.getLogger(__name__)
 # 全局 RAG 实例
 rag_instance = None
 
+# 语义查询缓存
+semantic_cache = None
+
+# /stats 结果缓存（以状态/图谱文件 mtime 为键，60 秒兜底过期）
+stats_cache = TTLCache(maxsize=1, ttl=60)
+
+# 限制同时进行的查询（每个查询都会调用 LLM）
+query_semaphore = asyncio.Semaphore(QUERY_CONCURRENCY)
+
 
-class QueryRequest(BaseModel):
+class QueryRequest(msgspec.Struct):
     """查询请求"""
-    query: str = Field(..., description="查询文本", min_length=1)
-    mode: str = Field(
-        default="hybrid",
-        description="查询模式: naive, local, global, hybrid"
-    )
-    top_k: int = Field(default=10, description="返回结果数量", ge=1, le=50)
-    only_need_context: bool = Field(
-        default=False,
-        description="是否只返回检索上下文（不调用 LLM 生成回答）"
-    )
+    query: Annotated[str, msgspec.Meta(min_length=1, description="查询文本")]
+    mode: Annotated[
+        str, msgspec.Meta(description="查询模式: naive, local, global, hybrid")
+    ] = "hybrid"
+    top_k: Annotated[int, msgspec.Meta(ge=1, le=50, description="返回结果数量")] = 10
+    only_need_context: Annotated[
+        bool, msgspec.Meta(description="是否只返回检索上下文（不调用 LLM 生成回答）")
+    ] = False
 
 
-class QueryResponse(BaseModel):
+class QueryResponse(msgspec.Struct):
     """查询响应"""
     query: str
     mode: str
     answer: str
     success: bool
+    cached: bool = False
+
+
+# /query 不经过 FastAPI 的 pydantic 校验，手动提供 OpenAPI 文档所需的 schema
+_, _query_schemas = msgspec.json.schema_components(
+    [QueryRequest, QueryResponse],
+    ref_template="#/components/schemas/{name}",
+)
 
 
 class HealthResponse(BaseModel):
@@ -52,10 +80,24 @@ class HealthResponse(BaseModel):
     db_path: str
 
 
+def _db_fingerprint(db_path: Path) -> str | None:
+    """知识库指纹：文档状态文件的 mtime + 大小（入库新文档后随之变化）"""
+    try:
+        st = (db_path / "kv_store_doc_status.json").stat()
+    except FileNotFoundError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    global rag_instance
+    global rag_instance, semantic_cache
+
+    # 扩大默认线程池（to_thread / run_in_executor 共用）
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=API_THREADPOOL_WORKERS)
+    )
 
     logger.info("正在初始化 LightRAG 实例...")
     try:
@@ -65,9 +107,21 @@ async def lifespan(app: FastAPI):
         logger.error(f"LightRAG 初始化失败: {e}")
         raise
 
+    semantic_cache = SemanticCache.load(
+        Path(LOCAL_DB),
+        EMBED_DIM,
+        max_elements=SEMANTIC_CACHE_MAX_ELEMENTS,
+        threshold=SEMANTIC_CACHE_THRESHOLD,
+        fingerprint=_db_fingerprint(Path(LOCAL_DB)),
+    )
+
     yield
 
     # 清理
+    try:
+        semantic_cache.save(Path(LOCAL_DB))
+    except Exception as e:
+        logger.error(f"保存语义缓存失败: {e}")
     logger.info("API 服务关闭")
 
 
@@ -88,6 +142,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 压缩较大的响应（/query 回答、/stats），level 1 以较低 CPU 换取大部分压缩率
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=1)
+
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -99,11 +156,27 @@ async def health_check():
     )
 
 
-@app.post("/query", response_model=QueryResponse)
-async def query(request: QueryRequest):
+@app.post(
+    "/query",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": _query_schemas["QueryRequest"]}},
+        },
+        "responses": {
+            "200": {
+                "description": "Successful Response",
+                "content": {"application/json": {"schema": _query_schemas["QueryResponse"]}},
+            },
+        },
+    },
+)
+async def query(http_request: Request):
     """
     查询知识库
 
+    请求体由 msgspec 直接解码校验，响应由 msgspec 直接编码，绕过 pydantic。
+
     查询模式说明:
     - naive: 简单关键词匹配
     - local: 基于局部上下文的检索
@@ -113,30 +186,87 @@ async def query(request: QueryRequest):
     if not rag_instance:
         raise HTTPException(status_code=503, detail="RAG 实例未就绪")
 
+    try:
+        request = msgspec.json.decode(await http_request.body(), type=QueryRequest)
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
     if request.mode not in ["naive", "local", "global", "hybrid"]:
         raise HTTPException(
-            status码=400,
+            status_code=400,
             detail=f"无效的查询模式: {request.mode}"
         )
 
     try:
         logger.info(f"查询: {request.query[:50]}... (mode={request.mode})")
 
-        # 执行查询
-        result = await rag_instance.aquery(
-            request.query,
-            param={
-                "mode": request.mode,
-                "top_k": request.top_k,
-                "only_need_context": request.only_need_context
-            }
-        )
-
-        return QueryResponse(
-            query=request.query,
-            mode=request.mode,
-            answer=result,
-            success=True
+        # 知识库更新后旧回答失效
+        fingerprint = _db_fingerprint(Path(LOCAL_DB))
+        if fingerprint != semantic_cache.fingerprint:
+            logger.info("知识库已更新，清空语义缓存")
+            semantic_cache.reset(fingerprint)
+
+        cache_key = [request.mode, request.top_k, request.only_need_context]
+
+        # 查询向量化与 LLM 查询都会调用上游 API，一并受并发限制
+        async with query_semaphore:
+            # 语义缓存：相似查询直接返回历史回答
+            try:
+                query_vector = (await rag_instance.embedding_func([request.query]))[0]
+            except Exception as e:
+                logger.warning(f"查询向量化失败，跳过语义缓存: {e}")
+                query_vector = None
+
+            cached_answer = None
+            if query_vector is not None:
+                try:
+                    cached_answer = semantic_cache.lookup(query_vector, cache_key)
+                except Exception as e:
+                    logger.warning(f"语义缓存查找失败，跳过缓存: {e}")
+
+            if cached_answer is None:
+                # 执行查询
+                result = await rag_instance.aquery(
+                    request.query,
+                    param={
+                        "mode": request.mode,
+                        "top_k": request.top_k,
+                        "only_need_context": request.only_need_context
+                    }
+                )
+
+        if cached_answer is not None:
+            return Response(
+                content=msgspec.json.encode(QueryResponse(
+                    query=request.query,
+                    mode=request.mode,
+                    answer=cached_answer,
+                    success=True,
+                    cached=True
+                )),
+                media_type="application/json"
+            )
+
+        # 查询期间知识库若已更新，回答基于旧数据，不写入缓存
+        if (
+            query_vector is not None
+            and isinstance(result, str)
+            and result
+            and semantic_cache.fingerprint == fingerprint
+        ):
+            try:
+                semantic_cache.add(query_vector, cache_key, result)
+            except Exception as e:
+                logger.warning(f"写入语义缓存失败: {e}")
+
+        return Response(
+            content=msgspec.json.encode(QueryResponse(
+                query=request.query,
+                mode=request.mode,
+                answer=result,
+                success=True
+            )),
+            media_type="application/json"
         )
 
     except Exception as e:
@@ -144,6 +274,76 @@ async def query(request: QueryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _count_occurrences(path: Path, needles: list[bytes], chunk_size: int = 1 << 20) -> dict[bytes, int]:
+    """分块读取文件统计各子串出现次数（块间保留 len(needle)-1 字节重叠，避免漏计跨块匹配）
+
+    与 mmap 不同，文件在读取过程中被其他进程截断也只会提前结束，不会导致进程崩溃。
+    """
+    counts = dict.fromkeys(needles, 0)
+    tails = dict.fromkeys(needles, b"")
+    with open(path, "rb") as f:
+        while block := f.read(chunk_size):
+            for needle in needles:
+                data = tails[needle] + block
+                counts[needle] += data.count(needle)
+                tails[needle] = data[-(len(needle) - 1):] if len(needle) > 1 else b""
+    return counts
+
+
+def _inspect_graphml(graphml: Path) -> dict:
+    """检查图谱文件的大小与节点/边数量"""
+    size = graphml.stat().st_size
+    counts = _count_occurrences(graphml, [b"<node ", b"<edge "])
+    return {
+        "size_kb": round(size / 1024, 2),
+        "nodes": counts[b"<node "],
+        "edges": counts[b"<edge "],
+    }
+
+
+def _collect_stats(db_path: Path) -> dict:
+    """同步收集知识库统计信息（在线程池中运行）"""
+    stats = {
+        "db_path": str(db_path),
+        "files": {}
+    }
+
+    # 检查各个存储文件
+    for f in db_path.glob("*.json"):
+        stats["files"][f.name] = {
+            "size_kb": round(f.stat().st_size / 1024, 2)
+        }
+
+    # 检查图谱文件
+    graphml = db_path / "graph_chunk_entity_relation.graphml"
+    if graphml.exists():
+        stats["files"]["graphml"] = _inspect_graphml(graphml)
+
+    # 读取文档状态
+    doc_status_file = db_path / "kv_store_doc_status.json"
+    if doc_status_file.exists():
+        # 流式解析，逐个文档计数，内存占用与文档数量无关
+        total = 0
+        counts = {"processed": 0, "processing": 0, "pending": 0, "failed": 0}
+        with open(doc_status_file, "rb") as f:
+            for _, doc in ijson.kvitems(f, ""):
+                total += 1
+                status = doc.get("status")
+                if status in counts:
+                    counts[status] += 1
+        stats["documents"] = {"total": total, **counts}
+
+    return stats
+
+
+def _mtime_ns(path: Path) -> int | None:
+    """文件修改时间（纳秒），文件不存在时返回 None"""
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
 @app.get("/stats")
 async def get_stats():
     """获取知识库统计信息"""
@@ -151,40 +351,18 @@ async def get_stats():
         raise HTTPException(status_code=503, detail="RAG 实例未就绪")
 
     try:
-        # 读取知识库状态文件
-        import json
         db_path = Path(LOCAL_DB)
 
-        stats = {
-            "db_path": str(db_path),
-            "files": {}
-        }
+        # 以文档状态文件和图谱文件的 mtime 作为缓存键，文件变化时立即失效
+        cache_key = tuple(
+            _mtime_ns(db_path / name)
+            for name in ("kv_store_doc_status.json", "graph_chunk_entity_relation.graphml")
+        )
 
-        # 检查各个存储文件
-        for f in db_path.glob("*.json"):
-            stats["files"][f.name] = {
-                "size_kb": round(f.stat().st_size / 1024, 2)
-            }
-
-        # 检查图谱文件
-        graphml = db_path / "graph_chunk_entity_relation.graphml"
-        if graphml.exists():
-            stats["files"]["graphml"] = {
-                "size_kb": round(graphml.stat().st_size / 1024, 2)
-            }
-
-        # 读取文档状态
-        doc_status_file = db_path / "kv_store_doc_status.json"
-        if doc_status_file.exists():
-            with open(doc_status_file, "r", encoding="utf-8") as f:
-                docs = json.load(f)
-            stats["documents"] = {
-                "total": len(docs),
-                "processed": sum(1 for d in docs.values() if d.get("status") == "processed"),
-                "processing": sum(1 for d in docs.values() if d.get("status") == "processing"),
-                "pending": sum(1 for d in docs.values() if d.get("status") == "pending"),
-                "failed": sum(1 for d in docs.values() if d.get("status") == "failed"),
-            }
+        stats = stats_cache.get(cache_key)
+        if stats is None:
+            stats = await asyncio.to_thread(_collect_stats, db_path)
+            stats_cache[cache_key] = stats
 
         return stats
 
@@ -199,5 +377,7 @@ if __name__ == "__main__":
         "api:app",
         host="0.0.0.0",
         port=8000,
-        reload=False
+        reload=False,
+        loop="uvloop",
+        http="httptools"
     )
@@ -24,6 +24,12 @@ RATE_LIMIT_WAIT = 60  # 429 错误等待时间
 # 并发控制
 EMBED_CONCURRENCY = 2
 LLM_CONCURRENCY = 3
+# 同时预处理的 EPUB 文件数
+FILE_CONCURRENCY = 2
+# API 同时执行的查询数（防止上游 429）
+QUERY_CONCURRENCY = int(os.environ.get("MAX_CONCURRENT_QUERIES", "8"))
+# API 默认线程池大小
+API_THREADPOOL_WORKERS = 32
 
 
 # ============== 文档处理配置 ==============
@@ -31,6 +37,8 @@ LLM_CONCURRENCY = 3
 MAX_CHAPTER_LENGTH = 15000
 # 分块重叠
 CHUNK_OVERLAP = 500
+# EPUB 解析与 RAG 插入之间的文本块队列长度（背压）
+CHUNK_QUEUE_SIZE = 32
 
 
 # ============== 小说类型定义 ==============
@@ -79,6 +87,12 @@ ENTITY_TYPES = [
 ]
 
 
+# ============== API 配置 ==============
+# 语义缓存：查询向量余弦相似度达到阈值时直接返回历史回答
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_MAX_ELEMENTS = 100_000
+
+
 # ============== 路径配置 ==============
 def get_paths() -> dict:
     """获取所有路径配置"""
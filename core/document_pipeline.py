@@ -1,13 +1,24 @@
 """文档处理流程"""
 import asyncio
+import hashlib
+import json
 import logging
+import os
+from collections.abc import Iterator
 from pathlib import Path
 
 from lightrag import LightRAG
 
-from config import is_force_reprocess
+from config import (
+    CHUNK_QUEUE_SIZE,
+    FILE_CONCURRENCY,
+    GENRE_MAIN,
+    GENRE_TAGS,
+    STYLE_TAGS,
+    is_force_reprocess,
+)
 from core.genre_detector import GenreDetector
-from processors.epub_processor import process_epub
+from processors.epub_processor import EPUBProcessor, process_epub
 from utils.dedup import (
     load_processed_files,
     save_processed_files,
@@ -17,6 +28,102 @@ from utils.dedup import (
 
 logger = logging.getLogger(__name__)
 
+GENRE_CACHE_FILE = "genre_cache.json"
+
+
+def _keywords_fingerprint() -> str:
+    """关键词表指纹（关键词变化时类型缓存整体失效）"""
+    payload = json.dumps([GENRE_MAIN, GENRE_TAGS, STYLE_TAGS], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_genre_cache(db_dir: Path) -> dict[str, str]:
+    """加载类型检测缓存
+
+    Args:
+        db_dir: 数据库目录
+
+    Returns:
+        {文件内容哈希: 类型信息}，关键词表变化或文件损坏时返回空字典
+    """
+    cache_file = db_dir / GENRE_CACHE_FILE
+    if not cache_file.exists():
+        return {}
+
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as exc:
+        logger.warning("读取类型缓存失败，忽略: %s", exc)
+        return {}
+
+    if data.get("keywords") != _keywords_fingerprint():
+        logger.info("关键词表已变化，类型缓存失效")
+        return {}
+
+    return data.get("entries", {})
+
+
+def save_genre_cache(db_dir: Path, genre_cache: dict[str, str]) -> None:
+    """保存类型检测缓存（先写临时文件再替换，避免中断时损坏）
+
+    Args:
+        db_dir: 数据库目录
+        genre_cache: {文件内容哈希: 类型信息}
+    """
+    cache_file = db_dir / GENRE_CACHE_FILE
+    tmp_file = cache_file.with_suffix(".json.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(
+            {"keywords": _keywords_fingerprint(), "entries": genre_cache},
+            f,
+            ensure_ascii=False,
+        )
+    os.replace(tmp_file, cache_file)
+
+
+def _genre_cache_key(path: Path) -> str:
+    """类型缓存键：文件内容 SHA-256 + 文件名（文件名也参与类型检测）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        缓存键
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return f"{digest.hexdigest()}:{path.name}"
+
+
+def iter_epub_files(root: Path) -> Iterator[str]:
+    """递归遍历目录下的 EPUB 文件（基于 os.scandir，复用目录项信息避免额外 stat）
+
+    Args:
+        root: 根目录
+
+    Yields:
+        EPUB 文件路径字符串
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except PermissionError as exc:
+            # 与 Path.rglob 一致：跳过无权限读取的目录
+            logger.warning("跳过无法读取的目录: %s - %s", directory, exc)
+            continue
+
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".epub"):
+                    yield entry.path
+
 
 async def insert_text_to_rag(rag: LightRAG, text: str) -> None:
     """插入文本到 RAG
@@ -40,6 +147,76 @@ async def insert_text_to_rag(rag: LightRAG, text: str) -> None:
         await loop.run_in_executor(None, insert_fn, text)
 
 
+def _detect_genre(path: Path, detector: GenreDetector) -> str:
+    """同步提取文本样本并检测类型（在线程池中运行）
+
+    Args:
+        path: EPUB 文件路径
+        detector: 类型检测器
+
+    Returns:
+        类型信息
+    """
+    sample_text = None
+    try:
+        processor = EPUBProcessor(path)
+        # 提取第一章前 5000 字符作为样本
+        for _, chapter_text in processor.extract_chapters():
+            sample_text = chapter_text[:5000]
+            break
+    except Exception as exc:
+        logger.warning("提取文本样本失败，仅使用文件名检测: %s", exc)
+
+    # 检测类型（带内容样本）
+    return detector.detect_from_file(path, sample_text)
+
+
+async def insert_epub_to_rag(
+    rag: LightRAG,
+    path: Path,
+    genre_info: str,
+    insert_lock: asyncio.Lock,
+) -> int:
+    """流水线插入 EPUB：线程池中解析生成文本块，同时从有界队列取出插入 RAG
+
+    Args:
+        rag: LightRAG 实例
+        path: EPUB 文件路径
+        genre_info: 类型信息
+        insert_lock: RAG 插入锁（多个文件共享，保证同一时刻只有一个插入）
+
+    Returns:
+        插入的文本块数量
+    """
+    queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=CHUNK_QUEUE_SIZE)
+
+    async def producer() -> None:
+        try:
+            # 处理 EPUB（自动分章节 + 分块），逐块在线程池中解析
+            chunks = await asyncio.to_thread(lambda: iter(process_epub(path, genre_info)))
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                await queue.put(chunk)
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    producer_task = asyncio.create_task(producer())
+    chunk_count = 0
+    try:
+        while (text_chunk := await queue.get()) is not None:
+            async with insert_lock:
+                await insert_text_to_rag(rag, text_chunk)
+            chunk_count += 1
+
+        # 抛出解析阶段的异常
+        await producer_task
+    finally:
+        producer_task.cancel()
+
+    return chunk_count
+
+
 async def process_documents(
     rag: LightRAG,
     source_dir: Path,
@@ -47,6 +224,9 @@ async def process_documents(
 ) -> None:
     """处理所有文档
 
+    多个文件并发处理：EPUB 解析与类型检测在线程池中进行，与 RAG 插入重叠；
+    RAG 插入本身通过共享锁串行执行（LightRAG 实例及其存储不支持并发插入）。
+
     Args:
         rag: LightRAG 实例
         source_dir: 源文件目录
@@ -58,57 +238,61 @@ async def process_documents(
     processed_files = load_processed_files(db_dir)
     logger.info("已加载 %d 条处理记录", len(processed_files))
 
+    # 加载类型检测缓存（内容未变化的文件跳过样本提取与检测）
+    genre_cache = load_genre_cache(db_dir)
+
     # 初始化检测器
     detector = GenreDetector()
 
+    semaphore = asyncio.Semaphore(FILE_CONCURRENCY)
+    save_lock = asyncio.Lock()
+    insert_lock = asyncio.Lock()
+
     new_processed = 0
     skipped = 0
 
-    # 遍历所有 EPUB 文件
-    for path in sorted(source_dir.rglob("*.epub")):
-        # 检查是否已处理
-        if not force_reprocess and is_file_processed(path, processed_files):
-            logger.debug("跳过已处理文件: %s", path)
-            skipped += 1
-            continue
-
-        logger.info("处理文件: %s", path)
+    async def process_file(path: Path) -> None:
+        nonlocal new_processed
 
-        try:
-            # 先提取一小段文本用于类型检测
-            from processors.epub_processor import EPUBProcessor
+        async with semaphore:
+            logger.info("处理文件: %s", path)
 
-            sample_text = None
             try:
-                processor = EPUBProcessor(path)
-                # 提取第一章前 5000 字符作为样本
-                for _, chapter_text in processor.extract_chapters():
-                    sample_text = chapter_text[:5000]
-                    break
-            except Exception as exc:
-                logger.warning("提取文本样本失败，仅使用文件名检测: %s", exc)
+                cache_key = await asyncio.to_thread(_genre_cache_key, path)
+                genre_info = genre_cache.get(cache_key)
+                if genre_info is None:
+                    genre_info = await asyncio.to_thread(_detect_genre, path, detector)
+                    genre_cache[cache_key] = genre_info
+                else:
+                    logger.info("使用缓存的类型信息: %s", genre_info)
 
-            # 检测类型（带内容样本）
-            genre_info = detector.detect_from_file(path, sample_text)
+                chunk_count = await insert_epub_to_rag(rag, path, genre_info, insert_lock)
 
-            # 处理 EPUB（自动分章节 + 分块）
-            chunk_count = 0
-            for text_chunk in process_epub(path, genre_info):
-                await insert_text_to_rag(rag, text_chunk)
-                chunk_count += 1
+                logger.info("文件处理完成: %s，共 %d 个文本块", path.name, chunk_count)
 
-            logger.info("文件处理完成，共 %d 个文本块", chunk_count)
+                # 每处理一个文件就保存一次（支持中断恢复）
+                async with save_lock:
+                    mark_file_processed(path, processed_files)
+                    new_processed += 1
+                    save_processed_files(db_dir, processed_files)
+                    save_genre_cache(db_dir, genre_cache)
 
-            # 标记为已处理
-            mark_file_processed(path, processed_files)
-            new_processed += 1
+            except Exception as exc:
+                logger.error("处理文件失败: %s - %s", path, exc)
 
-            # 每处理一个文件就保存一次（支持中断恢复）
-            save_processed_files(db_dir, processed_files)
+    # 遍历所有 EPUB 文件
+    pending = []
+    for path_str in sorted(iter_epub_files(source_dir)):
+        path = Path(path_str)
 
-        except Exception as exc:
-            logger.error("处理文件失败: %s - %s", path, exc)
+        # 检查是否已处理
+        if not force_reprocess and is_file_processed(path, processed_files):
+            logger.debug("跳过已处理文件: %s", path)
+            skipped += 1
             continue
+        pending.append(path)
+
+    await asyncio.gather(*(process_file(path) for path in pending))
 
     logger.info(
         "文档处理完成: 新增 %d 个，跳过 %d 个，总计 %d 个",
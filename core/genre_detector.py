@@ -1,7 +1,14 @@
 """小说风格检测器"""
 import logging
+import re
+from collections import defaultdict
 from pathlib import Path
 
+try:
+    import ahocorasick
+except ImportError:  # 未安装 pyahocorasick 时退化为预编译正则
+    ahocorasick = None
+
 from config import GENRE_MAIN, GENRE_TAGS, STYLE_TAGS
 
 logger = logging.getLogger(__name__)
@@ -15,6 +22,49 @@ class GenreDetector:
         self.genre_tags = GENRE_TAGS
         self.style_tags = STYLE_TAGS
 
+        # 所有关键词预编译为一个 Aho-Corasick 自动机，单次扫描即可统计全部类别
+        # 同一关键词可能出现在多个类别中（如 "宫斗"、"碾压"），因此值为列表
+        entries = defaultdict(list)
+        for category, table in (
+            ("main", self.genre_main),
+            ("sub", self.genre_tags),
+            ("style", self.style_tags),
+        ):
+            for genre, keywords in table.items():
+                for kw in keywords:
+                    entries[kw].append((category, genre))
+
+        self.keyword_targets = {kw: tuple(targets) for kw, targets in entries.items()}
+
+        if ahocorasick is not None:
+            self.ac = ahocorasick.Automaton()
+            for kw, targets in self.keyword_targets.items():
+                self.ac.add_word(kw, targets)
+            self.ac.make_automaton()
+            self.keyword_re = None
+        else:
+            # 零宽前瞻在每个位置都尝试匹配（长关键词优先），取该位置最长的关键词；
+            # 同一位置开始的其他关键词都是它的前缀，因此把前缀关键词的类别一并计入，
+            # 使命中次数（包括嵌套、重叠的关键词）与 Aho-Corasick 完全一致
+            self.ac = None
+            self.keyword_re = re.compile(
+                "(?=("
+                + "|".join(
+                    re.escape(kw)
+                    for kw in sorted(self.keyword_targets, key=len, reverse=True)
+                )
+                + "))"
+            )
+            self.prefix_targets = {
+                kw: tuple(
+                    target
+                    for other, targets in self.keyword_targets.items()
+                    if kw.startswith(other)
+                    for target in targets
+                )
+                for kw in self.keyword_targets
+            }
+
     def detect_from_text(self, text: str, sample_size: int = 5000) -> str:
         """从文本内容检测类型
 
@@ -28,14 +78,17 @@ class GenreDetector:
         # 采样前 N 字符（开头通常包含关键信息）
         sample = text[:sample_size]
 
+        # 单次扫描统计所有类别的关键词命中
+        scores = self._scan(sample)
+
         # 检测主类型
-        main_type = self._detect_main_type(sample)
+        main_type = self._pick_main_type(scores["main"])
 
         # 检测子类型/标签
-        sub_tags = self._detect_sub_tags(sample)
+        sub_tags = self._pick_tags(scores["sub"], limit=3)
 
         # 检测风格
-        style_tags = self._detect_style(sample)
+        style_tags = self._pick_tags(scores["style"], limit=2)
 
         # 格式化输出
         parts = [main_type]
@@ -74,6 +127,65 @@ class GenreDetector:
         logger.warning("文件名和内容均无法检测类型: %s", file_path.name)
         return "未分类 | 待分析"
 
+    def _scan(self, text: str) -> dict[str, dict[str, int]]:
+        """单次扫描文本，统计各类别下每个类型的关键词命中次数
+
+        Args:
+            text: 文本样本
+
+        Returns:
+            {类别: {类型: 命中次数}}，类别为 main / sub / style；
+            仅包含有命中的类型，并保持配置表中的顺序（命中次数相同时按表顺序取）
+        """
+        # 按配置表顺序预置计数，使并列时的取舍与关键词在文本中出现的位置无关
+        scores = {
+            "main": dict.fromkeys(self.genre_main, 0),
+            "sub": dict.fromkeys(self.genre_tags, 0),
+            "style": dict.fromkeys(self.style_tags, 0),
+        }
+
+        if self.ac is not None:
+            hits = (targets for _, targets in self.ac.iter(text))
+        else:
+            hits = (self.prefix_targets[m.group(1)] for m in self.keyword_re.finditer(text))
+
+        for targets in hits:
+            for category, genre in targets:
+                scores[category][genre] += 1
+
+        return {
+            category: {genre: count for genre, count in counts.items() if count}
+            for category, counts in scores.items()
+        }
+
+    @staticmethod
+    def _pick_main_type(scores: dict[str, int]) -> str:
+        """取命中次数最高的主类型
+
+        Args:
+            scores: {主类型: 命中次数}
+
+        Returns:
+            主类型名称，无命中时返回 "未分类"
+        """
+        if not scores:
+            return "未分类"
+        return max(scores, key=scores.get)
+
+    @staticmethod
+    def _pick_tags(scores: dict[str, int], limit: int) -> list[str]:
+        """按命中次数降序取前 N 个标签
+
+        Args:
+            scores: {标签: 命中次数}
+            limit: 最多返回的标签数
+
+        Returns:
+            标签列表
+        """
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [tag for tag, _ in ranked[:limit]]
+
     def _detect_main_type(self, text: str) -> str:
         """检测主类型
 
@@ -83,6 +195,26 @@ class GenreDetector:
         Returns:
             主类型名称
         """
-        scores = {}
+        return self._pick_main_type(self._scan(text)["main"])
+
+    def _detect_sub_tags(self, text: str) -> list[str]:
+        """检测子类型/标签
 
-        for genre, keywords in self.genre_main items...
\ No newline at end of file
+        Args:
+            text: 文本样本
+
+        Returns:
+            子类型标签列表
+        """
+        return self._pick_tags(self._scan(text)["sub"], limit=3)
+
+    def _detect_style(self, text: str) -> list[str]:
+        """检测风格
+
+        Args:
+            text: 文本样本
+
+        Returns:
+            风格标签列表
+        """
+        return self._pick_tags(self._scan(text)["style"], limit=2)
@@ -0,0 +1,167 @@
+"""语义查询缓存（基于 numpy 的余弦相似度扫描）"""
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "semcache.npy"
+ENTRIES_FILE = "semcache.json"
+
+# 向量矩阵初始容量（按需倍增，上限为 max_elements）
+INITIAL_CAPACITY = 1024
+
+
+class SemanticCache:
+    """按查询向量的余弦相似度复用历史回答"""
+
+    def __init__(
+        self,
+        dim: int,
+        max_elements: int = 100_000,
+        threshold: float = 0.95,
+        fingerprint: str | None = None,
+    ):
+        self.dim = dim
+        self.max_elements = max_elements
+        self.threshold = threshold
+        self.reset(fingerprint)
+
+    def reset(self, fingerprint: str | None) -> None:
+        """清空缓存，并记录当前知识库指纹
+
+        Args:
+            fingerprint: 知识库指纹（知识库变化后旧回答不再有效）
+        """
+        # 回答基于哪个版本的知识库生成
+        self.fingerprint = fingerprint
+
+        # 归一化后的查询向量，前 len(entries) 行有效
+        self.vectors = np.empty((min(INITIAL_CAPACITY, self.max_elements), self.dim), dtype=np.float32)
+
+        # 下标与 vectors 的行号对应：{"key": 查询参数, "answer": 回答}
+        self.entries: list[dict] = []
+
+    def _normalize(self, vector: np.ndarray) -> np.ndarray:
+        """转换为 float32 单位向量，维度不符时抛出 ValueError"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"向量维度 {vector.shape[0]} 与缓存维度 {self.dim} 不一致")
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector: np.ndarray, key: list) -> str | None:
+        """查找相似查询的缓存回答
+
+        Args:
+            vector: 查询向量
+            key: 查询参数（模式等），必须完全一致才命中
+
+        Returns:
+            缓存的回答，未命中返回 None
+        """
+        if not self.entries:
+            return None
+
+        similarities = self.vectors[:len(self.entries)] @ self._normalize(vector)
+
+        # 只对超过阈值的候选按相似度降序检查参数
+        candidates = np.flatnonzero(similarities >= self.threshold)
+        for idx in candidates[np.argsort(-similarities[candidates])]:
+            entry = self.entries[int(idx)]
+            if entry["key"] == key:
+                return entry["answer"]
+
+        return None
+
+    def add(self, vector: np.ndarray, key: list, answer: str) -> None:
+        """写入缓存（容量已满时忽略）
+
+        Args:
+            vector: 查询向量
+            key: 查询参数
+            answer: 回答
+        """
+        count = len(self.entries)
+        if count >= self.max_elements:
+            return
+
+        normalized = self._normalize(vector)
+
+        if count == self.vectors.shape[0]:
+            capacity = min(count * 2, self.max_elements)
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            grown[:count] = self.vectors
+            self.vectors = grown
+
+        self.vectors[count] = normalized
+        self.entries.append({"key": key, "answer": answer})
+
+    def save(self, directory: Path) -> None:
+        """持久化向量与回答
+
+        Args:
+            directory: 保存目录
+        """
+        np.save(directory / VECTORS_FILE, self.vectors[:len(self.entries)])
+        with open(directory / ENTRIES_FILE, "w", encoding="utf-8") as f:
+            json.dump(
+                {"fingerprint": self.fingerprint, "entries": self.entries},
+                f,
+                ensure_ascii=False,
+            )
+
+    @classmethod
+    def load(
+        cls,
+        directory: Path,
+        dim: int,
+        max_elements: int = 100_000,
+        threshold: float = 0.95,
+        fingerprint: str | None = None,
+    ) -> "SemanticCache":
+        """从目录加载缓存，文件不存在、损坏或知识库指纹不一致时返回空缓存
+
+        Args:
+            directory: 保存目录
+            dim: 向量维度
+            max_elements: 最大缓存条数
+            threshold: 命中所需的最小余弦相似度
+            fingerprint: 当前知识库指纹
+
+        Returns:
+            SemanticCache 实例
+        """
+        cache = cls(dim, max_elements=max_elements, threshold=threshold, fingerprint=fingerprint)
+
+        vectors_file = directory / VECTORS_FILE
+        entries_file = directory / ENTRIES_FILE
+        if not (vectors_file.exists() and entries_file.exists()):
+            return cache
+
+        try:
+            with open(entries_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data["fingerprint"] != fingerprint:
+                logger.info("知识库已更新，丢弃语义缓存")
+                return cache
+
+            vectors = np.load(vectors_file).astype(np.float32, copy=False)
+            entries = data["entries"][:max_elements]
+            if vectors.ndim != 2 or vectors.shape[1] != dim or vectors.shape[0] < len(entries):
+                raise ValueError("向量与回答条数或维度不一致")
+
+            cache.vectors = np.empty(
+                (max(len(entries), min(INITIAL_CAPACITY, max_elements)), dim), dtype=np.float32
+            )
+            cache.vectors[:len(entries)] = vectors[:len(entries)]
+            cache.entries = entries
+            logger.info("已加载语义缓存: %d 条", len(cache.entries))
+        except Exception as exc:
+            logger.warning("加载语义缓存失败，使用空缓存: %s", exc)
+            cache = cls(dim, max_elements=max_elements, threshold=threshold, fingerprint=fingerprint)
+
+        return cache